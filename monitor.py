@@ -1,110 +1,279 @@
 import time
+import heapq
+import asyncio
+import atexit
+import queue
 import psutil
 import argparse
 import logging
-from datetime import datetime
+import logging.handlers
 from rich.live import Live
 from rich.layout import Layout
 from rich.panel import Panel
 from rich.table import Table
 from rich.console import Console
+from rich.text import Text
 from rich import box
 
 # --- CONFIGURACIÓN DE LOGS (Puntos: Persistencia y Diagnóstico) ---
-logging.basicConfig(filename='sistema_alertas.log', level=logging.WARNING, 
-                    format='%(asctime)s - %(message)s')
+# El bucle de la interfaz solo encola los registros; un hilo del QueueListener
+# es quien escribe en el archivo, así la escritura a disco nunca bloquea el refresco
+_log_queue = queue.Queue(-1)
+_log_file = logging.FileHandler('sistema_alertas.log')
+_log_file.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_file)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+
+# Mientras la CPU siga por encima del umbral se registra como máximo una alerta por minuto
+ALERT_REPEAT_SECONDS = 60
+_last_alert_ts = 0.0
+_alerting = False
 
 # Argumentos de línea de comandos (Puntos: Dificultad/Manejo de SO)
 parser = argparse.ArgumentParser(description="Monitor de Sistema Avanzado")
-parser.add_argument("--threshold", type=int, default=85, help="Umbral de alerta CPU (%)")
+parser.add_argument("--threshold", type=int, default=85, help="Umbral de alerta CPU (%%)")
+parser.add_argument("--show-swap", action=argparse.BooleanOptionalAction, default=True,
+                    help="Mostrar el uso de SWAP en el panel de memoria")
+parser.add_argument("--show-mem-col", action=argparse.BooleanOptionalAction, default=True,
+                    help="Mostrar la columna MEM %% en la tabla de procesos")
+parser.add_argument("--percore", action=argparse.BooleanOptionalAction, default=True,
+                    help="Mostrar el uso de cada núcleo (se oculta solo si la terminal no tiene espacio)")
 args = parser.parse_args()
 CPU_THRESHOLD = args.threshold
+SHOW_SWAP = args.show_swap
+SHOW_MEM_COL = args.show_mem_col
+SHOW_PERCORE = args.percore
+
+# El número de núcleos no cambia en tiempo de ejecución: se consulta una sola vez
+NUM_CPUS = psutil.cpu_count() or 1
+
+# Constantes del sistema que no cambian mientras corre el monitor
+_TOTAL_GB = psutil.virtual_memory().total / (1024 ** 3)
+_SWAP_TOTAL_GB = psutil.swap_memory().total / (1024 ** 3)
+_TOTAL_GB_STR = f"{_TOTAL_GB:.2f} GB"
+
+UPDATE_INTERVAL = 0.5
+
+# Recorrer todos los procesos es lo más costoso: se refresca cada PROC_EVERY_TICKS ciclos
+# en un hilo aparte, para que CPU/memoria/I/O no esperen por él
+PROC_EVERY_TICKS = 4
+_proc_task = None
+
+# Barras de uso precalculadas: una por cada longitud posible (0..20) y color.
+# Son Text con estilo ya aplicado, así Rich no interpreta markup al renderizar
+_BAR_COLORS = ("green", "yellow", "red")
+_BARS = {color: tuple(Text('|' * n, style=color) for n in range(21)) for color in _BAR_COLORS}
+
+# Porcentajes ya formateados de 0.0% a 100.0% en pasos de 0.1
+_PCT_LUT = [f"{i / 10:.1f}%" for i in range(1001)]
+
+def _pct(value):
+    """Formatea un porcentaje con un decimal usando la tabla precalculada."""
+    i = int(round(value * 10))
+    # El CPU % de un proceso puede pasar de 100 en equipos multinúcleo
+    return _PCT_LUT[i] if 0 <= i <= 1000 else f"{value:.1f}%"
+
+# Contadores de la lectura anterior: el panel de I/O muestra tasas (delta / tiempo)
+# en lugar de acumulados que crecen sin límite
+_last_net = psutil.net_io_counters()
+_last_disk = psutil.disk_io_counters()
+_last_ts = time.monotonic()
+# Hasta la primera lectura real (tras IO_MIN_INTERVAL) se muestran ceros: medir
+# contra la base de arriba a los pocos milisegundos daría tasas sin sentido
+_io_rates = (0.0, 0.0, 0, 0)
+# Leer /proc/net/dev y /proc/diskstats cada 0.5 s no aporta nada visible: mínimo 2 s
+IO_MIN_INTERVAL = 2.0
+
+# Huella de los últimos datos mostrados: si no cambia, no se reconstruye ni repinta nada
+_last_digest = None
+_last_header_time = None
+_procs_dirty = False
+_layout_size = None
+_ratio_names = None
+
+# Hora del encabezado: el texto solo cambia una vez por segundo
+_last_sec = -1
+_cached_time_str = ""
+
+def _current_time_str():
+    global _last_sec, _cached_time_str
+    now = int(time.time())
+    if now != _last_sec:
+        _cached_time_str = time.strftime("%H:%M:%S", time.localtime(now))
+        _last_sec = now
+    return _cached_time_str
 
-def get_cpu_panel():
+# --- ESTRUCTURA ESTÁTICA DE LOS PANELES ---
+# Columnas, bordes y títulos no cambian: se crean una vez y en cada refresco
+# solo se reemplazan las filas.
+def _clear_rows(table):
+    """Vacía las filas de una tabla reutilizable conservando sus columnas."""
+    table.rows.clear()
+    for column in table.columns:
+        column._cells.clear()
+
+_CPU_TABLE = Table(show_header=False, box=None, expand=True)
+_CPU_TABLE.add_column("Core", ratio=1)
+_CPU_TABLE.add_column("Uso", ratio=1)
+_core_cells = _CPU_TABLE.columns[1]._cells
+
+def _set_core_rows(count):
+    """Crea una fila por núcleo; en cada refresco solo se reemplaza su celda de uso."""
+    _clear_rows(_CPU_TABLE)  # Vacía las listas en sitio: _core_cells sigue siendo válida
+    for i in range(count):
+        _CPU_TABLE.add_row(f"Core {i}", Text())
+
+_set_core_rows(NUM_CPUS)
+_CPU_PANEL = Panel(_CPU_TABLE)
+_CPU_PERCORE_HIDDEN = Text("Vista por núcleo oculta (sin espacio en la terminal)", style="dim")
+_CPU_PERCORE_OFF = Text("Vista por núcleo desactivada (--no-percore)", style="dim")
+
+console = Console()
+
+def _percore_visible(layout):
+    """Indica si las filas por núcleo caben en el panel de CPU."""
+    if not SHOW_PERCORE:
+        return False
+    # Alto ya resuelto del panel de CPU menos 2 líneas de borde; si no caben,
+    # muestrear cada núcleo es desperdicio
+    return layout["cpu"].size - 2 >= NUM_CPUS
+
+_MEM_TABLE = Table(show_header=False, box=None, expand=True)
+_MEM_TABLE.add_column("Recurso")
+_MEM_TABLE.add_column("Valor")
+_MEM_PANEL = Panel(_MEM_TABLE, title="Memoria (RAM + Swap)" if SHOW_SWAP else "Memoria (RAM)",
+                   border_style="green")
+
+_IO_TABLE = Table(show_header=True, header_style="bold magenta", expand=True)
+_IO_TABLE.add_column("Recurso")
+_IO_TABLE.add_column("Actividad por Segundo")
+_IO_PANEL = Panel(_IO_TABLE, title="I/O Sistema", border_style="cyan")
+
+_PROC_TABLE = Table(expand=True, box=box.SIMPLE)
+_PROC_TABLE.add_column("PID", justify="right", style="cyan", no_wrap=True)
+_PROC_TABLE.add_column("Nombre", style="magenta")
+_PROC_TABLE.add_column("CPU %", justify="right", style="green")
+if SHOW_MEM_COL:
+    _PROC_TABLE.add_column("MEM %", justify="right", style="yellow") # Dato extra agregado
+_PROC_PANEL = Panel(_PROC_TABLE, border_style="white")
+
+def get_cpu_panel(cpu_total, cpu_per_core):
     """Genera panel de CPU con lógica de alertas."""
-    cpu_total = psutil.cpu_percent(interval=None)
-    cpu_per_core = psutil.cpu_percent(interval=None, percpu=True)
     
     # Lógica de Alerta (Originalidad)
+    global _last_alert_ts, _alerting
     border_color = "blue"
     if cpu_total > CPU_THRESHOLD:
         border_color = "bright_red"
-        logging.warning(f"ALERTA CPU: Uso total {cpu_total}% superó el umbral de {CPU_THRESHOLD}%")
+        now = time.monotonic()
+        if not _alerting or now - _last_alert_ts > ALERT_REPEAT_SECONDS:
+            logger.warning(f"ALERTA CPU: Uso total {cpu_total}% superó el umbral de {CPU_THRESHOLD}%")
+            _last_alert_ts = now
+            _alerting = True
+    elif _alerting:
+        logger.warning(f"CPU NORMALIZADA: Uso total {cpu_total}% por debajo del umbral de {CPU_THRESHOLD}%")
+        _alerting = False
 
-    table = Table(show_header=False, box=None, expand=True)
-    table.add_column("Core", ratio=1)
-    table.add_column("Uso", ratio=1)
-    
+    if cpu_per_core:
+        _CPU_PANEL.renderable = _CPU_TABLE
+    else:
+        _CPU_PANEL.renderable = _CPU_PERCORE_HIDDEN if SHOW_PERCORE else _CPU_PERCORE_OFF
+    if cpu_per_core and len(cpu_per_core) != len(_core_cells):
+        _set_core_rows(len(cpu_per_core))  # Se conectó o desconectó una CPU
     for i, core_usage in enumerate(cpu_per_core):
         color = "green" if core_usage < 50 else "yellow" if core_usage < CPU_THRESHOLD else "red"
-        bar = f"[{color}]{'|' * int(core_usage / 5)}[/]"
-        table.add_row(f"Core {i}", f"{core_usage}% {bar}")
+        bar = _BARS[color][min(int(core_usage / 5), 20)]
+        _core_cells[i] = Text.assemble(_pct(core_usage), " ", bar)
 
-    return Panel(
-        table, 
-        title=f"CPU Total: {cpu_total}% (Umbral: {CPU_THRESHOLD}%)", 
-        border_style=border_color
-    )
+    _CPU_PANEL.title = f"CPU Total: {cpu_total}% (Umbral: {CPU_THRESHOLD}%)"
+    _CPU_PANEL.border_style = border_color
+    return _CPU_PANEL
 
-def get_memory_panel():
-    mem = psutil.virtual_memory()
-    swap = psutil.swap_memory() # Agregamos SWAP para mayor dificultad técnica
-    
-    total_gb = mem.total / (1024 ** 3)
-    used_gb = mem.used / (1024 ** 3)
-    
-    table = Table(show_header=False, box=None, expand=True)
-    table.add_row("RAM Total", f"{total_gb:.2f} GB")
+def get_memory_panel(used_gb, mem_percent, swap_used_gb=None):
+    table = _MEM_TABLE
+    _clear_rows(table)
+    table.add_row("RAM Total", _TOTAL_GB_STR)
     table.add_row("RAM Usada", f"{used_gb:.2f} GB")
-    table.add_row("RAM %", f"{mem.percent}%")
-    table.add_row("SWAP Usada", f"{swap.used / (1024**3):.2f} GB") # Dato extra SO
+    table.add_row("RAM %", f"{mem_percent}%")
+    if swap_used_gb is not None:
+        table.add_row("SWAP Usada", f"{swap_used_gb:.2f} / {_SWAP_TOTAL_GB:.2f} GB") # Dato extra SO
     
-    return Panel(table, title="Memoria (RAM + Swap)", border_style="green")
+    return _MEM_PANEL
+
+def _sample_io():
+    """Devuelve las tasas de red/disco, redondeadas a la precisión mostrada."""
+    global _last_net, _last_disk, _last_ts, _io_rates
+    now = time.monotonic()
+    dt = now - _last_ts
+    if dt < IO_MIN_INTERVAL:
+        return _io_rates  # Se mantienen las tasas de la última lectura
 
-def get_network_disk_panel():
     net = psutil.net_io_counters()
     disk = psutil.disk_io_counters()
-    
-    table = Table(show_header=True, header_style="bold magenta", expand=True)
-    table.add_column("Recurso")
-    table.add_column("Actividad Acumulada")
-    
-    sent_mb = net.bytes_sent / (1024 ** 2)
-    recv_mb = net.bytes_recv / (1024 ** 2)
-    
-    table.add_row("Red Enviado", f"{sent_mb:.1f} MB")
-    table.add_row("Red Recibido", f"{recv_mb:.1f} MB")
+
+    sent_rate = (net.bytes_sent - _last_net.bytes_sent) / dt / (1024 ** 2)
+    recv_rate = (net.bytes_recv - _last_net.bytes_recv) / dt / (1024 ** 2)
+    read_rate = (disk.read_count - _last_disk.read_count) / dt
+    write_rate = (disk.write_count - _last_disk.write_count) / dt
+    _last_net, _last_disk, _last_ts = net, disk, now
+    _io_rates = (round(sent_rate, 2), round(recv_rate, 2), round(read_rate), round(write_rate))
+    return _io_rates
+
+def get_network_disk_panel(io_rates):
+    sent_rate, recv_rate, read_rate, write_rate = io_rates
+    table = _IO_TABLE
+    _clear_rows(table)
+    table.add_row("Red Enviado", f"{sent_rate:.2f} MB/s")
+    table.add_row("Red Recibido", f"{recv_rate:.2f} MB/s")
     table.add_section()
-    # Mostramos actividad en vivo calculando delta si fuera necesario, 
-    # pero acumulado es válido para I/O básico.
-    table.add_row("Disco Lecturas", f"{disk.read_count}")
-    table.add_row("Disco Escrituras", f"{disk.write_count}")
-    
-    return Panel(table, title="I/O Sistema", border_style="cyan")
+    table.add_row("Disco Lecturas", f"{read_rate:.0f} op/s")
+    table.add_row("Disco Escrituras", f"{write_rate:.0f} op/s")
 
-def get_processes_panel(top_n=10):
+    return _IO_PANEL
+
+def _collect_procs():
+    """Lee (pid, nombre, cpu %, mem %) de los procesos vivos (bloqueante: va en el executor)."""
     procs = []
-    # Optimizamos iteración para velocidad
-    for p in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
+    # process_iter() ya reutiliza los objetos Process entre llamadas (solo crea los
+    # de PIDs nuevos y descarta los de PIDs reutilizados), y cpu_percent() necesita
+    # el mismo objeto entre llamadas para medir el delta
+    for proc in psutil.process_iter():
         try:
-            procs.append(p.info)
+            # oneshot() agrupa las lecturas de /proc/<pid> de todos los atributos
+            with proc.oneshot():
+                mem = 0.0
+                if SHOW_MEM_COL:
+                    try:
+                        mem = proc.memory_percent()
+                    except psutil.AccessDenied:
+                        pass  # Un campo denegado no oculta el proceso: se muestra 0.0
+                procs.append((proc.pid, proc.name(), proc.cpu_percent(), mem))
         except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-            
-    top_procs = sorted(procs, key=lambda p: p['cpu_percent'] or 0, reverse=True)[:top_n]
-    
-    table = Table(expand=True, box=box.SIMPLE)
-    table.add_column("PID", justify="right", style="cyan", no_wrap=True)
-    table.add_column("Nombre", style="magenta")
-    table.add_column("CPU %", justify="right", style="green")
-    table.add_column("MEM %", justify="right", style="yellow") # Dato extra agregado
+            pass  # Terminó durante la lectura, es zombie o no hay permisos
+    return procs
+
+def get_processes_panel(procs, top_n=10):
+    # Solo necesitamos los top_n: heapq evita ordenar la lista completa
+    top_procs = heapq.nlargest(top_n, procs, key=lambda p: p[2])
 
-    for p in top_procs:
-        cpu = p['cpu_percent'] if p['cpu_percent'] is not None else 0.0
-        mem = p['memory_percent'] if p['memory_percent'] is not None else 0.0
-        table.add_row(str(p['pid']), p['name'], f"{cpu:.1f}%", f"{mem:.1f}%")
+    # Filas ya formateadas como Text: Rich no tiene que interpretar markup en cada celda
+    # (de paso, un nombre de proceso con "[" ya no se confunde con una etiqueta)
+    rows = [
+        (Text(str(pid)), Text(name), Text(_pct(cpu)))
+        + ((Text(_pct(mem)),) if SHOW_MEM_COL else ())
+        for pid, name, cpu, mem in top_procs
+    ]
+    table = _PROC_TABLE
+    _clear_rows(table)
+    for row in rows:
+        table.add_row(*row)
 
-    return Panel(table, title=f"Top {top_n} Procesos", border_style="white")
+    _PROC_PANEL.title = f"Top {top_n} Procesos"
+    return _PROC_PANEL
 
 def make_layout():
     layout = Layout(name="root")
@@ -124,21 +293,111 @@ def make_layout():
     layout["right_col"].update(Panel("Cargando procesos..."))
     return layout
 
-def update_layout(layout):
-    current_time = datetime.now().strftime("%H:%M:%S")
-    layout["header"].update(Panel(f"Monitor Avanzado | Log activo: sistema_alertas.log | Hora: {current_time}", style="bold white on blue"))
-    layout["cpu"].update(get_cpu_panel())
-    layout["memory"].update(get_memory_panel())
-    layout["io"].update(get_network_disk_panel())
-    layout["right_col"].update(get_processes_panel())
+def _fix_layout_sizes(layout, width, height):
+    """Convierte las proporciones del layout en tamaños fijos para la terminal actual."""
+    # Con tamaños fijos Rich no recalcula el reparto proporcional en cada repintado.
+    # Los repartos salen de los ratio de make_layout(), así que solo hay que guardar
+    # qué paneles eran proporcionales antes de fijarles un tamaño
+    global _ratio_names
+    if _ratio_names is None:
+        _ratio_names = {node.name for node in _walk_layout(layout) if node.size is None}
+
+    children = layout.children
+    if not children:
+        return
+    vertical = layout.splitter.name == "column"
+    total = height if vertical else width
+    flexible = [child for child in children if child.name in _ratio_names]
+    remaining = max(total - sum(c.size for c in children if c.name not in _ratio_names), 0)
+    ratio_total = sum(child.ratio for child in flexible)
+    assigned = 0
+    for child in flexible[:-1]:
+        child.size = remaining * child.ratio // ratio_total
+        assigned += child.size
+    if flexible:
+        flexible[-1].size = remaining - assigned
+
+    for child in children:
+        if vertical:
+            _fix_layout_sizes(child, width, child.size)
+        else:
+            _fix_layout_sizes(child, child.size, height)
+
+def _walk_layout(layout):
+    yield layout
+    for child in layout.children:
+        yield from _walk_layout(child)
+
+async def tick_procs(layout):
+    global _procs_dirty
+    loop = asyncio.get_running_loop()
+    procs = await loop.run_in_executor(None, _collect_procs)
+    layout["right_col"].update(get_processes_panel(procs))
+    _procs_dirty = True
+
+async def update_layout(layout, tick=0):
+    """Actualiza los paneles; devuelve False si no hubo cambios que repintar."""
+    global _proc_task, _last_digest, _last_header_time, _procs_dirty, _layout_size
+    # Los tamaños solo se recalculan cuando cambia la terminal
+    size = console.size
+    resized = size != _layout_size
+    if resized:
+        _fix_layout_sizes(layout, size.width, size.height)
+        _layout_size = size
+
+    # Si la lectura anterior de procesos sigue en curso no se lanza otra
+    if tick % PROC_EVERY_TICKS == 0 and (_proc_task is None or _proc_task.done()):
+        if _proc_task is not None:
+            _proc_task.result()  # Propaga cualquier error del hilo de procesos
+        _proc_task = asyncio.create_task(tick_procs(layout))
+
+    current_time = _current_time_str()
+    if _percore_visible(layout):
+        # Una sola lectura por núcleo; el total es la media (misma muestra, sin doble lectura)
+        cpu_per_core = psutil.cpu_percent(interval=None, percpu=True)
+        cpu_total = round(sum(cpu_per_core) / len(cpu_per_core), 1)
+    else:
+        cpu_per_core = []
+        cpu_total = psutil.cpu_percent(interval=None)
+    mem = psutil.virtual_memory()
+    # Memoria y swap redondeadas a la precisión mostrada, igual que las tasas de I/O
+    used_gb = round(mem.used / (1024 ** 3), 2)
+    # Agregamos SWAP para mayor dificultad técnica
+    swap_used_gb = round(psutil.swap_memory().used / (1024 ** 3), 2) if SHOW_SWAP else None
+    io_rates = _sample_io()
+
+    # El reloj va aparte: que cambie el segundo no obliga a reconstruir los demás paneles
+    header_changed = current_time != _last_header_time
+    if header_changed:
+        layout["header"].update(Panel(f"Monitor Avanzado | Log activo: sistema_alertas.log | Hora: {current_time}", style="bold white on blue"))
+        _last_header_time = current_time
+
+    procs_changed, _procs_dirty = _procs_dirty, False
+    digest = (cpu_total, tuple(cpu_per_core), used_gb, mem.percent, swap_used_gb, io_rates)
+    if digest == _last_digest:
+        return procs_changed or resized or header_changed
+    _last_digest = digest
+
+    # Construir los paneles es trabajo de CPU sin esperas: se hace directamente,
+    # la única tarea concurrente es la lectura de procesos en el executor
+    layout["cpu"].update(get_cpu_panel(cpu_total, cpu_per_core))
+    layout["memory"].update(get_memory_panel(used_gb, mem.percent, swap_used_gb))
+    layout["io"].update(get_network_disk_panel(io_rates))
+    return True
+
+async def run_monitor(layout, live):
+    tick = 0
+    while True:
+        # Sin auto_refresh, Rich solo repinta cuando update_layout reporta cambios
+        if await update_layout(layout, tick):
+            live.refresh()
+        tick += 1
+        await asyncio.sleep(UPDATE_INTERVAL)
 
 if __name__ == "__main__":
     try:
-        console = Console()
         layout = make_layout()
-        with Live(layout, refresh_per_second=2, screen=True) as live:
-            while True:
-                update_layout(layout)
-                time.sleep(0.5)
+        with Live(layout, console=console, refresh_per_second=2, auto_refresh=False, screen=True) as live:
+            asyncio.run(run_monitor(layout, live))
     except KeyboardInterrupt:
         print("Monitor finalizado. Revise 'sistema_alertas.log' para ver incidencias.")
\ No newline at end of file